@@ -0,0 +1,70 @@
+"""
+Startup benchmark: import time of each entry module in a fresh interpreter,
+and optionally the time to build the catalog and Dash layout for a key.
+
+Usage:
+    python benchmarks/startup.py [key.csv] [--repeat N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    'data_analysis.SF_analysis_processing',
+    'data_analysis.plotting_dash',
+    'dash_app.dash_app',
+    'dash_app.callbacks',
+]
+
+def time_import(module, repeat):
+    """
+    Return the best wall time in seconds to start Python and import the module.
+    """
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        times.append(float(result.stdout.strip()))
+    return min(times)
+
+def time_layout(key_file_path):
+    sys.path.insert(0, REPO_ROOT)
+    from data_analysis.SF_analysis_processing import build_catalog, load_key_from_csv
+    from dash_app.layout import create_layout
+
+    key = load_key_from_csv(key_file_path)
+    start = time.perf_counter()
+    catalog = build_catalog(key)
+    catalog_time = time.perf_counter() - start
+    start = time.perf_counter()
+    create_layout(key, catalog)
+    layout_time = time.perf_counter() - start
+    return catalog_time, layout_time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('key_file', nargs='?', help='Key CSV used to time catalog and layout construction')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        elapsed = time_import(module, args.repeat)
+        if elapsed is None:
+            print(f"{module:45s} import failed (missing dependency?)")
+        else:
+            print(f"{module:45s} {elapsed * 1000:8.1f} ms")
+
+    if args.key_file:
+        catalog_time, layout_time = time_layout(args.key_file)
+        print(f"{'build_catalog':45s} {catalog_time * 1000:8.1f} ms")
+        print(f"{'create_layout':45s} {layout_time * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
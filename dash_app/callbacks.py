@@ -1,9 +1,15 @@
 from dash.dependencies import Input, Output, State
 import dash
+import functools
+import numpy as np
 import plotly.graph_objs as go
 import data_analysis.plotting_dash as plotting_dash
+from data_analysis.SF_analysis_processing import extract_comparison_series, resample_onto_grid
 
-def register_callbacks(app, key):
+# Number of points on the shared grid of the comparison plot
+COMPARISON_GRID_POINTS = 500
+
+def register_callbacks(app, key, catalog):
 # Add a callback to update the button text based on the current scale
     @app.callback(
         Output('toggle-x-axis', 'children'),
@@ -56,19 +62,13 @@ def register_callbacks(app, key):
     def update_dropdowns(selected_substrate):
         if not selected_substrate:
             return [], [], []
-        filtered_data = key[key['substrate'] == selected_substrate]
-        
-        ph_values = filtered_data['pH'].unique().tolist()
-        ph_values.sort()
-        ph_options = [{'label': ph, 'value': ph} for ph in ph_values]
-        
-        solvents = filtered_data['solvent'].unique().tolist()
-        solvents.sort()
-        solvent_options = [{'label': solvent, 'value': solvent} for solvent in solvents]
-        
-        concentrations = filtered_data['substrate_concentration'].unique().tolist()
-        concentrations.sort()
-        concentration_options = [{'label': c, 'value': c} for c in concentrations]
+        options = catalog.get(selected_substrate)
+        if options is None:
+            return [], [], []
+
+        ph_options = [{'label': ph, 'value': ph} for ph in options['pH']]
+        solvent_options = [{'label': solvent, 'value': solvent} for solvent in options['solvent']]
+        concentration_options = [{'label': c, 'value': c} for c in options['substrate_concentration']]
         
         return ph_options, solvent_options, concentration_options
     
@@ -228,3 +228,66 @@ def register_callbacks(app, key):
 
         return fig, {'index': current_index}, disable_previous, disable_next, min_time, max_time, slider_value, slider_marks, slider_disabled, time_step_slider_disabled, plot_info_text, plot_info_style
 
+
+    # Resampled comparison data, cached per push set and grid
+    @functools.lru_cache(maxsize=32)
+    def resampled_comparison(pushes, mode, value, log_grid, subtract_baseline_flag):
+        xs, ys = extract_comparison_series(key, pushes, mode, value, subtract_baseline_flag)
+        nonempty = [x for x in xs if len(x)]
+        if not nonempty:
+            return None, None
+        low = min(x[0] for x in nonempty)
+        high = max(x[-1] for x in nonempty)
+        # Times start at 0, so a log grid starts from the earliest positive time
+        positive = [x[x > 0] for x in nonempty]
+        positive = [x for x in positive if len(x)]
+        if log_grid and positive:
+            grid = np.geomspace(min(x[0] for x in positive), high, COMPARISON_GRID_POINTS)
+        else:
+            grid = np.linspace(low, high, COMPARISON_GRID_POINTS)
+        return grid, resample_onto_grid(xs, ys, grid)
+
+    # Callback to overlay every push matching the comparison filters
+    @app.callback(
+        [Output('compare-plot-area', 'figure'),
+         Output('compare-info', 'children'),
+         Output('compare-value', 'placeholder')],
+        [Input('compare-substrate-dropdown', 'value'),
+         Input('compare-ph-dropdown', 'value'),
+         Input('compare-solvent-dropdown', 'value'),
+         Input('compare-concentration-dropdown', 'value'),
+         Input('compare-mode', 'value'),
+         Input('compare-value', 'value'),
+         Input('compare-log-time', 'value'),
+         Input('baseline-flag', 'data')]
+    )
+    def update_comparison_plot(selected_substrates, selected_phs, selected_solvents, selected_concentrations, mode, value, log_time, baseline_flag_data):
+        placeholder = 'Wavelength (nm)' if mode == 'trace' else 'Time'
+        if 'data' not in key.columns:
+            return go.Figure(), 'No processed data', placeholder
+
+        # Empty filters match every experiment. Baselines are left out unless
+        # they are selected explicitly through the substrate filter
+        matches = key[key['data'].notnull()]
+        if not selected_substrates or '-' not in selected_substrates:
+            matches = matches[matches['substrate'] != '-']
+        filters = [('substrate', selected_substrates), ('pH', selected_phs),
+                   ('solvent', selected_solvents), ('substrate_concentration', selected_concentrations)]
+        for column, selected in filters:
+            if selected:
+                matches = matches[matches[column].isin(selected)]
+
+        info = f'{len(matches)} experiments'
+        if matches.empty or value is None:
+            return go.Figure(), info, placeholder
+
+        log_grid = mode == 'trace' and 'log' in log_time
+        grid, resampled = resampled_comparison(tuple(matches['push']), mode, float(value), log_grid, baseline_flag_data['baseline'])
+        if grid is None:
+            return go.Figure(), info, placeholder
+
+        labels = [f"{row['push']} (pH {row['pH']}, {row['substrate_concentration']}, {row['solvent']})"
+                  for _, row in matches.iterrows()]
+        fig = plotting_dash.plot_comparison(grid, resampled, labels, mode, value,
+                                            xaxis_type='log' if log_grid else 'linear')
+        return fig, info, placeholder
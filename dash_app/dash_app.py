@@ -1,15 +1,25 @@
-import dash_bootstrap_components as dbc
-from dash import Dash
-from dash_app.layout import create_layout
-from dash_app.callbacks import register_callbacks
+from data_analysis.SF_analysis_processing import build_catalog
 
-def create_dash_app(key):
+# Dash, dash-bootstrap-components and the plotting modules are imported when
+# the app is built, so importing this module does not pay for them
+
+def create_dash_app(key, catalog=None):
+    import dash_bootstrap_components as dbc
+    from dash import Dash
+    from dash_app.layout import create_layout
+
+    if catalog is None:
+        catalog = build_catalog(key)
     app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
-    app.layout = create_layout(key) 
+    app.layout = create_layout(key, catalog) 
     return app
 
-def run_dash(key):
-    app = create_dash_app(key)
-    register_callbacks(app, key)
+def run_dash(key, catalog=None):
+    from dash_app.callbacks import register_callbacks
+
+    if catalog is None:
+        catalog = build_catalog(key)
+    app = create_dash_app(key, catalog)
+    register_callbacks(app, key, catalog)
     app.run_server(debug=True)
     # app.run(jupyter_mode="external")
@@ -21,10 +21,10 @@ def create_sidebar(key):
     )
     return sidebar
 
-def create_dropdowns(key):
-    substrates = key['substrate'].unique().tolist()
-    substrates.sort()
-    
+def create_dropdowns(catalog):
+    # Catalog keys are already sorted by build_catalog
+    substrates = list(catalog)
+
     dropdowns = html.Div([
         "Substrate:",
         dcc.Dropdown(
@@ -78,4 +78,39 @@ def create_sliders():
         dcc.Slider(id='time-step-slider', min=1, max=100, value=10, step=10, disabled=True)
     ], style={'margin-bottom': '20px'})
 
-    return sliders
\ No newline at end of file
+    return sliders
+
+def create_comparison(catalog):
+    # Filters accept several values each; an empty filter matches everything
+    def all_values(column):
+        return sorted({value for options in catalog.values() for value in options[column]})
+
+    def options(values):
+        return [{'label': v, 'value': v} for v in values]
+
+    comparison = html.Div([
+        html.H5('Compare Experiments'),
+        html.Div([
+            html.Div(["Substrate:", dcc.Dropdown(id='compare-substrate-dropdown', options=options(list(catalog)), multi=True)]),
+            html.Div(["pH:", dcc.Dropdown(id='compare-ph-dropdown', options=options(all_values('pH')), multi=True)]),
+            html.Div(["Solvent:", dcc.Dropdown(id='compare-solvent-dropdown', options=options(all_values('solvent')), multi=True)]),
+            html.Div(["Substrate Concentration:", dcc.Dropdown(id='compare-concentration-dropdown', options=options(all_values('substrate_concentration')), multi=True)]),
+        ], style={'display': 'grid', 'grid-template-columns': '1fr 1fr 1fr 1fr', 'gap': '10px'}),
+        html.Div([
+            dcc.RadioItems(
+                id='compare-mode',
+                options=[{'label': 'Wavelength traces', 'value': 'trace'},
+                         {'label': 'Spectra', 'value': 'spectrum'}],
+                value='trace',
+                inline=True,
+                style={'margin-right': '20px'}
+            ),
+            dcc.Input(id='compare-value', type='number', placeholder='Wavelength (nm)',
+                      debounce=True, style={'width': '150px', 'margin-right': '20px'}),
+            dcc.Checklist(id='compare-log-time', options=[{'label': 'Log Time Scale', 'value': 'log'}], value=[], inline=True),
+            html.Span(id='compare-info', style={'margin-left': '20px'}),
+        ], style={'display': 'flex', 'align-items': 'center', 'margin-top': '10px'}),
+        dcc.Graph(id='compare-plot-area'),
+    ], style={'margin-top': '30px', 'margin-bottom': '20px'})
+
+    return comparison
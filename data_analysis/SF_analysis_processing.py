@@ -1,6 +1,36 @@
+import json
 import os
+import numpy as np
 import pandas as pd
 
+def find_baseline_experiments(key, experiment):
+    """
+    Find the baseline experiments recorded under the same conditions as an experiment.
+
+    Parameters:
+    key (pd.DataFrame): The DataFrame containing the experiments.
+    experiment (pd.Series): The experiment to match, e.g. from get_by_push.
+
+    Returns:
+    pd.DataFrame: The matching baseline rows, empty if there are none.
+    """
+    # Extracting the required properties from the target experiment
+    target_properties = {
+        'solvent': experiment['solvent'],
+        'date': experiment['date'],
+        'Ty': experiment['Ty'],
+        'pH': experiment['pH']
+    }
+
+    return key[
+        (key['solvent'] == target_properties['solvent']) &
+        (key['date'] == target_properties['date']) &
+        (key['Ty'] == target_properties['Ty']) &
+        (key['pH'] == target_properties['pH']) &
+        (key['substrate'] == '-') &
+        (key['substrate_concentration'] == '-')
+    ]
+
 def find_baseline_for_push(key, push_number):
     """
     Find the baseline experiment for a given push number.
@@ -20,23 +50,8 @@ def find_baseline_for_push(key, push_number):
         print(f"No experiment found with push number {push_number}.")
         return None
 
-    # Extracting the required properties from the target experiment
-    target_properties = {
-        'solvent': target_experiment['solvent'],
-        'date': target_experiment['date'],
-        'Ty': target_experiment['Ty'],
-        'pH': target_experiment['pH']
-    }
-
     # Find the baseline experiment
-    baseline = key[
-        (key['solvent'] == target_properties['solvent']) &
-        (key['date'] == target_properties['date']) &
-        (key['Ty'] == target_properties['Ty']) &
-        (key['pH'] == target_properties['pH']) &
-        (key['substrate'] == '-') &
-        (key['substrate_concentration'] == '-')
-    ]
+    baseline = find_baseline_experiments(key, target_experiment)
 
     if baseline.empty:
         # If no baseline experiment is found
@@ -87,64 +102,249 @@ def find_closest_wavelength(data, desired_wavelength):
 
     return str(closest_wavelength)
 
-def process_csv_file(file_path):
+DEFAULT_CHUNK_SIZE = 2048
+
+def _locate_data(f, base_name):
     """
-    Process a single CSV file. Skip initial rows, transpose if necessary, and reshape.
-    Adjusts the cutoff line based on the file name 
+    Advance an open CSV file past the instrument preamble to its data header.
+    Adjusts the cutoff line based on the file name.
+
+    Returns:
+    tuple: The header fields and whether the data is stored transposed
+           (one row per wavelength instead of one row per time point).
     """
     # List of files with a different cutoff line
     special_files = ['Pda00357.csv', 'Pda00327.csv', 'Pda00336.csv', 
                      'Pda00337.csv', 'Pda00338.csv', 'Pda00339.csv', 
                      'Pda00344.csv', 'Pda00348.csv', 'Pda00349.csv', 
                      'Pda00352.csv', 'Pda00355.csv', 'Pda00356.csv']
-
-    data_lines = []
-    # Extract the base name of the file from the path
-    base_name = os.path.basename(file_path)
     cutoffLine = 27 if base_name in special_files else 26
 
     transposed = False
-    with open(file_path, 'r') as f:
-        for i, line in enumerate(f):
-            if i == cutoffLine -1:
-                # Check if the line before cutoff indicates transposed data
-                transposed = 'Wavelength' in line.split(',')[0]
-                continue
-            if i < cutoffLine:
-                continue;
-            if ('Count' in line):
-                break;
-            if i == cutoffLine and not transposed:
+    for i, line in enumerate(f):
+        if i == cutoffLine - 1:
+            # Check if the line before cutoff indicates transposed data
+            transposed = 'Wavelength' in line.split(',')[0]
+        elif i == cutoffLine:
+            if not transposed:
                 line = 'Time' + line
-            data_lines.append(line)
-
-    # Extract headers from the first line
-    headers = data_lines[0].split(',')[:-1]
-    df = pd.DataFrame([sub.split(',') for sub in data_lines[1:]], columns=headers)
-    df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
-    df = df.apply(pd.to_numeric, errors='coerce')
-
-    # Transpose DataFrame if transposed
-    if transposed:
-        # Transpose the DataFrame
-        df_transposed = df.transpose()   
-        # Now the first row contains the new headers, set them and then drop the first row
-        df_transposed.columns = df_transposed.iloc[0]
-        df_transposed = df_transposed.drop(df_transposed.index[0])       
-        # Reset the index to make sure 'Time' is a column and not the index
-        df_transposed.reset_index(inplace=True)       
-        # Rename 'index' to 'Time' to match your desired output
-        df_transposed.rename(columns={'index': 'Time'}, inplace=True)
-        df = df_transposed
-        df = df.iloc[:,:-1]
-    
-    if not transposed: 
-        df = df.iloc[:-1]
+            return line.split(',')[:-1], transposed
+    raise ValueError(f"No data found in {base_name}.")
 
-    # Standardize headers to strings
-    df.columns = df.columns.astype(str)
+def _data_lines(f):
+    # Data rows run until the 'Count' footer
+    for line in f:
+        if 'Count' in line:
+            return
+        yield line
 
-    return df
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+def _lines_to_array(lines, n_fields):
+    """
+    Convert raw CSV lines to a float array, coercing unparseable values to NaN.
+    """
+    rows = [line.split(',')[:n_fields] for line in lines]
+    try:
+        return np.array(rows, dtype=float).reshape(len(rows), n_fields)
+    except ValueError:
+        # Slow path for blank, ragged or non-numeric rows
+        return np.array([[_to_float(x) for x in row] + [np.nan] * (n_fields - len(row))
+                         for row in rows], dtype=float).reshape(len(rows), n_fields)
+
+def _iter_row_chunks(lines, n_fields, chunk_size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        # Hold one row back so the trailing row can be dropped below
+        if len(batch) > chunk_size:
+            yield _lines_to_array(batch[:chunk_size], n_fields)
+            batch = batch[chunk_size:]
+    # The last row before the footer is not part of the acquisition
+    if len(batch) > 1:
+        yield _lines_to_array(batch[:-1], n_fields)
+
+def _iter_csv_chunks(file_path, n_fields, chunk_size):
+    with open(file_path, 'r') as f:
+        _locate_data(f, os.path.basename(file_path))
+        yield from _iter_row_chunks(_data_lines(f), n_fields, chunk_size)
+
+def _read_transposed(lines, headers):
+    # Rows are wavelengths and columns are time points, so the whole block has
+    # to be read before it can be turned into time-ordered rows
+    block = _lines_to_array(list(lines), len(headers))[:-1]
+    times = np.array([_to_float(t) for t in headers[1:]])
+    data = np.column_stack([times, block[:, 1:].T])
+    columns = ['Time'] + [str(float(w)) for w in block[:, 0]]
+    return columns, data
+
+def stream_csv_file(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream a single CSV file as fixed-size row chunks of floats.
+
+    Parameters:
+    file_path (str): Path to the CSV file.
+    chunk_size (int): Number of time points per chunk.
+
+    Returns:
+    tuple: The column names ('Time' followed by the wavelengths) and a generator
+           of 2D float arrays, one row per time point with 'Time' in column 0.
+           Peak memory is bounded by the chunk size, except for transposed
+           files which have to be read in full.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}.")
+    base_name = os.path.basename(file_path)
+    with open(file_path, 'r') as f:
+        headers, transposed = _locate_data(f, base_name)
+        if transposed:
+            columns, data = _read_transposed(_data_lines(f), headers)
+            return columns, (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+    return list(headers), _iter_csv_chunks(file_path, len(headers), chunk_size)
+
+def chunks_to_dataframe(columns, chunks):
+    """
+    Collect a chunk stream into a DataFrame with string column headers.
+    """
+    blocks = list(chunks)
+    data = np.vstack(blocks) if blocks else np.empty((0, len(columns)))
+    return pd.DataFrame(data, columns=[str(c) for c in columns])
+
+def process_csv_file(file_path):
+    """
+    Process a single CSV file. Skip initial rows, transpose if necessary, and reshape.
+    Adjusts the cutoff line based on the file name 
+    """
+    columns, chunks = stream_csv_file(file_path)
+    return chunks_to_dataframe(columns, chunks)
+
+def crop_chunks(chunks, time_cutoff=None, start_time=None):
+    """
+    Streaming counterpart of filter_by_time_cutoff.
+    Stops reading once a chunk runs past time_cutoff, since acquisition times
+    increase monotonically.
+    """
+    for chunk in chunks:
+        times = chunk[:, 0]
+        mask = np.ones(len(times), dtype=bool)
+        if start_time is not None:
+            mask &= times >= start_time
+        if time_cutoff is not None:
+            mask &= times <= time_cutoff
+        if mask.any():
+            yield chunk[mask]
+        if time_cutoff is not None and len(times) and times[-1] > time_cutoff:
+            return
+
+def downsample_chunks(chunks, time_step):
+    """
+    Keep every time_step-th time point across the whole stream.
+    """
+    offset = 0
+    for chunk in chunks:
+        yield chunk[-offset % time_step::time_step]
+        offset = (offset + len(chunk)) % time_step
+
+def baseline_from_chunks(chunks):
+    """
+    Average each wavelength over all time points of a baseline stream.
+
+    Returns:
+    np.ndarray: The averaged baseline, excluding 'Time', or None if the stream is empty.
+    """
+    total, count = None, None
+    for chunk in chunks:
+        values = chunk[:, 1:]
+        if total is None:
+            total = np.zeros(values.shape[1])
+            count = np.zeros(values.shape[1])
+        total += np.nansum(values, axis=0)
+        count += np.count_nonzero(~np.isnan(values), axis=0)
+
+    if total is None:
+        return None
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return total / count
+
+def subtract_baseline_chunks(columns, chunks, baseline):
+    """
+    Streaming counterpart of subtract_baseline.
+    Like subtract_baseline, the baseline is matched to the wavelength columns by
+    name, columns without a baseline value are left unchanged, and the final
+    time point is dropped.
+
+    Parameters:
+    columns (list): The column names of the stream, 'Time' first.
+    chunks (iterable): The chunk stream, e.g. from stream_csv_file.
+    baseline (pd.Series): Baseline values indexed by wavelength column name.
+    """
+    baseline_values = baseline.reindex(columns[1:]).fillna(0).to_numpy(dtype=float)
+    pending = None
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        adjusted = chunk.copy()
+        adjusted[:, 1:] -= baseline_values
+        # Hold the last row back until the next chunk shows it is not the final one
+        if pending is not None:
+            yield np.vstack([pending, adjusted[:-1]])
+        else:
+            yield adjusted[:-1]
+        pending = adjusted[-1:]
+
+def average_chunk_streams(*streams):
+    """
+    Average replicate pushes chunk by chunk.
+    The streams must be chunked the same way, so average before cropping or downsampling.
+    Stops with the shortest replicate.
+    """
+    for chunks in zip(*streams):
+        n_rows = min(len(chunk) for chunk in chunks)
+        if n_rows < max(len(chunk) for chunk in chunks):
+            # Replicates of different length: average the shared rows, then stop
+            yield np.nanmean(np.stack([chunk[:n_rows] for chunk in chunks]), axis=0)
+            return
+        yield np.nanmean(np.stack(chunks), axis=0)
+
+def write_chunks_to_cache(columns, chunks, cache_path):
+    """
+    Write a chunk stream to a binary cache file without materializing it.
+    The file holds the column names as JSON and then the raw float64 rows, so
+    load_cached_data can memory-map it back.
+
+    Returns:
+    int: The number of time points written.
+    """
+    header = json.dumps([str(c) for c in columns]).encode('utf-8')
+    # Pad the header so the float rows start 8-byte aligned
+    header += b' ' * (-len(header) % 8)
+    n_rows = 0
+    with open(cache_path, 'wb') as f:
+        np.array([len(header)], dtype='<i8').tofile(f)
+        f.write(header)
+        for chunk in chunks:
+            np.ascontiguousarray(chunk, dtype='<f8').tofile(f)
+            n_rows += len(chunk)
+    return n_rows
+
+def load_cached_data(cache_path):
+    """
+    Load a file written by write_chunks_to_cache as a read-only DataFrame
+    backed by a memory map of the file, with the original column names.
+    """
+    with open(cache_path, 'rb') as f:
+        header_length = int(np.fromfile(f, dtype='<i8', count=1)[0])
+        columns = json.loads(f.read(header_length).decode('utf-8'))
+    offset = 8 + header_length
+    if os.path.getsize(cache_path) == offset:
+        return pd.DataFrame(np.empty((0, len(columns))), columns=columns)
+    data = np.memmap(cache_path, dtype='<f8', mode='r', offset=offset).reshape(-1, len(columns))
+    return pd.DataFrame(data, columns=columns, copy=False)
 
 def load_key_from_csv(key_csv_file_path):
     """
@@ -153,6 +353,25 @@ def load_key_from_csv(key_csv_file_path):
     # return pd.read_csv(key_csv_file_path).to_dict(orient='records')
     return pd.read_csv(key_csv_file_path)
 
+def build_catalog(key):
+    """
+    Precompute the sorted dropdown values for every substrate in the key.
+
+    Parameters:
+    key (pd.DataFrame): The DataFrame containing the experiments.
+
+    Returns:
+    dict: Maps each substrate to its sorted 'pH', 'solvent' and
+          'substrate_concentration' values.
+    """
+    catalog = {}
+    for substrate, experiments in key.groupby('substrate', sort=True):
+        catalog[substrate] = {
+            column: sorted(experiments[column].unique().tolist())
+            for column in ('pH', 'solvent', 'substrate_concentration')
+        }
+    return catalog
+
 def get_experiments_by_criteria(key, **criteria):
     filtered_data = key
     for key, value in criteria.items():
@@ -225,4 +444,148 @@ def filter_by_time_cutoff(data, time_cutoff, start_time=None):
         return None
     # Filter the data
     filtered_data = data[data['Time'] <= time_cutoff]
-    return filtered_data
\ No newline at end of file
+    return filtered_data
+
+def fit_single_exponential(times, values):
+    """
+    Fit a single exponential, A(t) = offset + amplitude * exp(-k_obs * t), to a kinetic trace.
+
+    Parameters:
+    times (np.ndarray): Time points of the trace.
+    values (np.ndarray): Intensity at each time point.
+
+    Returns:
+    dict: 'k_obs', 'amplitude' and 'offset' with their standard errors
+          ('k_obs_err', 'amplitude_err', 'offset_err').
+    """
+    from scipy.optimize import curve_fit
+
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    valid = ~(np.isnan(times) | np.isnan(values))
+    times, values = times[valid], values[valid]
+    if len(times) < 4:
+        raise ValueError(f"Need at least 4 points to fit, got {len(times)}.")
+
+    def model(t, k_obs, amplitude, offset):
+        return offset + amplitude * np.exp(-k_obs * t)
+
+    # Start from a decay that is mostly complete by the end of the trace
+    span = times.max() - times.min()
+    initial = [3.0 / span if span > 0 else 1.0, values[0] - values[-1], values[-1]]
+    params, covariance = curve_fit(model, times, values, p0=initial, maxfev=10000)
+    errors = np.sqrt(np.diag(covariance))
+
+    return {
+        'k_obs': params[0], 'amplitude': params[1], 'offset': params[2],
+        'k_obs_err': errors[0], 'amplitude_err': errors[1], 'offset_err': errors[2],
+    }
+
+def resample_onto_grid(xs, ys, grid):
+    """
+    Linearly interpolate many series onto one shared grid in a single vectorized step.
+
+    Parameters:
+    xs (list of np.ndarray): The x values of each series, each in increasing order.
+    ys (list of np.ndarray): The y values of each series.
+    grid (np.ndarray): The shared x values to resample onto.
+
+    Returns:
+    np.ndarray: One row per series, NaN where the grid lies outside that series.
+    """
+    grid = np.asarray(grid, dtype=float)
+    lengths = np.array([len(x) for x in xs], dtype=int)
+    resampled = np.full((len(xs), len(grid)), np.nan)
+    # Interpolation needs at least two points per series
+    keep = np.flatnonzero(lengths >= 2)
+    if len(keep) == 0 or len(grid) == 0:
+        return resampled
+
+    lengths = lengths[keep]
+    flat_x = np.concatenate([np.asarray(xs[i], dtype=float) for i in keep])
+    flat_y = np.concatenate([np.asarray(ys[i], dtype=float) for i in keep])
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+
+    # Shift each series into its own disjoint interval so that one searchsorted
+    # over the concatenated x values locates the grid points for every series
+    low = min(flat_x.min(), grid.min())
+    width = max(flat_x.max(), grid.max()) - low + 1.0
+    offsets = np.arange(len(keep)) * width
+    shifted = flat_x - low + np.repeat(offsets, lengths)
+    queries = grid[None, :] - low + offsets[:, None]
+    positions = np.searchsorted(shifted, queries, side='right')
+
+    left = np.clip(positions - 1, starts[:, None], (ends - 2)[:, None])
+    right = left + 1
+    x0, x1 = flat_x[left], flat_x[right]
+    y0, y1 = flat_y[left], flat_y[right]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.where(x1 > x0, (grid[None, :] - x0) / (x1 - x0), 0.0)
+    inside = (grid[None, :] >= flat_x[starts][:, None]) & (grid[None, :] <= flat_x[ends - 1][:, None])
+    resampled[keep] = np.where(inside, y0 + fraction * (y1 - y0), np.nan)
+    return resampled
+
+def extract_comparison_series(key, pushes, mode, value, subtract_baseline_flag=False):
+    """
+    Pull one series per push for overlaying experiments.
+
+    Parameters:
+    key (pd.DataFrame): The DataFrame containing the experiments and their data.
+    pushes (list): The push identifiers to extract.
+    mode (str): 'trace' for intensity vs. time at a wavelength, or 'spectrum' for
+                intensity vs. wavelength at a time point.
+    value (float): The wavelength (nm) for 'trace' or the time for 'spectrum'.
+
+    Returns:
+    tuple: Lists of x and y arrays, with x sorted and NaN points removed. In
+           'spectrum' mode the arrays are empty for pushes whose time range
+           does not contain value.
+    """
+    xs, ys = [], []
+    # Averaged baselines by baseline push, so each is computed once per call
+    baselines = {}
+    for push in pushes:
+        experiment = get_by_push(key, push)
+        data = experiment['data']
+        times = pd.to_numeric(data['Time'], errors='coerce').to_numpy(dtype=float)
+        positions = [i for i, col in enumerate(data.columns) if col != 'Time']
+        wavelength_columns = [data.columns[i] for i in positions]
+
+        baseline = None
+        if subtract_baseline_flag:
+            matches = find_baseline_experiments(key, experiment)
+            matches = matches[matches['data'].notnull()]
+            if not matches.empty:
+                baseline_push = matches['push'].values[0]
+                if baseline_push not in baselines:
+                    baselines[baseline_push] = matches['data'].values[0].drop(columns=['Time']).mean()
+                baseline = baselines[baseline_push]
+                # subtract_baseline drops the final time point
+                times = times[:-1]
+
+        if mode == 'trace':
+            # Select the column by position, since headers such as '300.10'
+            # do not round-trip through float
+            wavelengths = np.array([float(col) for col in wavelength_columns])
+            index = int(np.abs(wavelengths - value).argmin())
+            x = times
+            y = data.iloc[:len(times), positions[index]].to_numpy(dtype=float)
+            if baseline is not None:
+                y = y - baseline.get(wavelength_columns[index], 0)
+        else:
+            # Pushes whose time range does not cover the time point have no spectrum there
+            if np.isnan(times).all() or not np.nanmin(times) <= value <= np.nanmax(times):
+                xs.append(np.empty(0))
+                ys.append(np.empty(0))
+                continue
+            x = np.array([float(col) for col in wavelength_columns])
+            y = data.iloc[int(np.nanargmin(np.abs(times - value))), positions].to_numpy(dtype=float)
+            if baseline is not None:
+                y = y - baseline.reindex(wavelength_columns).fillna(0).to_numpy(dtype=float)
+
+        valid = ~np.isnan(x)
+        order = np.argsort(x[valid], kind='stable')
+        xs.append(x[valid][order])
+        ys.append(y[valid][order])
+    return xs, ys
@@ -0,0 +1,324 @@
+"""
+Headless batch processing: ingest -> baseline -> crop -> fit -> export.
+
+Usage:
+    python -m data_analysis.batch RAW_DATA_DIR KEY_CSV -o OUTPUT_DIR [options]
+
+Writes to OUTPUT_DIR:
+    data/<push>.bin  processed data per push (see load_cached_data)
+    summary.csv      the key with a status, baseline and row count per push
+    fits.csv         single-exponential fits at the requested wavelengths
+    timing.csv       wall time per push and stage
+    errors.csv       one row per failed file
+
+Exits with status 1 if any file fails. Only the processing module is
+imported; nothing here pulls in plotly or Dash.
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_analysis.SF_analysis_processing import (
+    DEFAULT_CHUNK_SIZE, baseline_from_chunks, crop_chunks, find_baseline_experiments,
+    fit_single_exponential, load_key_from_csv, stream_csv_file, subtract_baseline_chunks,
+    write_chunks_to_cache,
+)
+
+def is_baseline(experiment):
+    return experiment['substrate'] == '-' and experiment['substrate_concentration'] == '-'
+
+def format_error(e):
+    return ''.join(traceback.format_exception_only(type(e), e)).strip()
+
+def compute_baseline(file_path, chunk_size):
+    """
+    Worker: average a baseline push over time.
+    """
+    start = time.perf_counter()
+    try:
+        columns, chunks = stream_csv_file(file_path, chunk_size)
+        baseline = baseline_from_chunks(chunks)
+        if baseline is None:
+            raise ValueError("Baseline file contains no data rows.")
+        return {'baseline': baseline, 'wavelengths': columns[1:],
+                'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'error': format_error(e),
+                'seconds': time.perf_counter() - start}
+
+def align_baseline(baseline_wavelengths, baseline_values, columns):
+    """
+    Put a baseline onto an acquisition's wavelength axis, matching wavelengths by value.
+    Push and baseline may come from files with different layouts, so their
+    column names and counts need not agree.
+
+    Returns:
+    pd.Series: Baseline values indexed by the acquisition's wavelength columns.
+    """
+    available = np.array([float(w) for w in baseline_wavelengths])
+    aligned, missing = {}, []
+    for column in columns[1:]:
+        matches = np.flatnonzero(np.isclose(available, float(column), rtol=0, atol=1e-6))
+        if len(matches):
+            aligned[column] = baseline_values[matches[0]]
+        else:
+            missing.append(column.strip())
+    if missing:
+        raise ValueError(f"No baseline value for wavelength(s) {', '.join(missing)}.")
+    return pd.Series(aligned)
+
+def process_push(push, file_path, baseline, options):
+    """
+    Worker: stream one push through baseline subtraction and cropping into its
+    cache file, keeping only the traces needed for fitting in memory.
+    baseline is a compute_baseline result, or None to skip subtraction.
+    """
+    result = {'push': push, 'fits': [], 'timing': {}}
+    stage = 'ingest'
+    try:
+        start = time.perf_counter()
+        columns, chunks = stream_csv_file(file_path, options['chunk_size'])
+        if baseline is not None:
+            aligned = align_baseline(baseline['wavelengths'], baseline['baseline'], columns)
+            chunks = subtract_baseline_chunks(columns, chunks, aligned)
+        if options['start_time'] is not None or options['time_cutoff'] is not None:
+            chunks = crop_chunks(chunks, options['time_cutoff'], options['start_time'])
+
+        # Closest measured wavelength column for each requested fit wavelength
+        wavelengths = np.array([float(c) for c in columns[1:]])
+        fit_indices = [int(np.abs(wavelengths - w).argmin()) + 1 for w in options['fit_wavelengths']]
+        traces = []
+
+        def collect_traces(chunks):
+            for chunk in chunks:
+                traces.append(chunk[:, [0] + fit_indices])
+                yield chunk
+
+        cache_path = os.path.join(options['output_dir'], 'data', f"{push}.bin")
+        result['n_timepoints'] = write_chunks_to_cache(columns, collect_traces(chunks), cache_path)
+        result['cache_path'] = cache_path
+        result['timing']['ingest'] = time.perf_counter() - start
+
+        if fit_indices:
+            stage = 'fit'
+            start = time.perf_counter()
+            data = np.vstack(traces) if traces else np.empty((0, len(fit_indices) + 1))
+            for i, (requested, index) in enumerate(zip(options['fit_wavelengths'], fit_indices)):
+                fit = {'push': push, 'requested_wavelength': requested, 'wavelength': columns[index]}
+                try:
+                    fit.update(fit_single_exponential(data[:, 0], data[:, i + 1]))
+                except Exception as e:
+                    # A failed fit is reported alongside the others, not as a file error
+                    fit['fit_error'] = format_error(e)
+                result['fits'].append(fit)
+            result['timing']['fit'] = time.perf_counter() - start
+    except Exception as e:
+        result['error'] = format_error(e)
+        result['stage'] = stage
+    return result
+
+def submit(executor, fn, *args):
+    """
+    Submit a job, turning a pool that can no longer accept work (e.g. after a
+    worker was killed) into a failed future instead of an exception.
+    """
+    try:
+        return executor.submit(fn, *args)
+    except Exception as e:
+        future = Future()
+        future.set_exception(e)
+        return future
+
+def worker_result(future):
+    """
+    Return a worker's result, or None with the error if the worker process died.
+    """
+    try:
+        return future.result(), None
+    except Exception as e:
+        return None, format_error(e)
+
+def find_push_files(directory_path, key):
+    """
+    Map each push in the key to its CSV file in the directory.
+
+    Returns:
+    tuple: {push: file path} for pushes with a file, and the CSV files that
+           do not match any push in the key.
+    """
+    pushes = set(key['push'])
+    files, unmatched = {}, []
+    for file_name in sorted(os.listdir(directory_path)):
+        if file_name.endswith('.csv'):
+            push = os.path.splitext(file_name)[0]
+            if push in pushes:
+                files[push] = os.path.join(directory_path, file_name)
+            else:
+                unmatched.append(file_name)
+    return files, unmatched
+
+def run_batch(directory_path, key_file_path, output_dir, jobs=None, start_time=None,
+              time_cutoff=None, fit_wavelengths=(), subtract_baselines=True,
+              chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Run the full pipeline over a directory of pushes and write the outputs.
+
+    Returns:
+    pd.DataFrame: One row per failed file (push, file, stage, error); empty on success.
+    """
+    batch_start = time.perf_counter()
+    os.makedirs(os.path.join(output_dir, 'data'), exist_ok=True)
+    key = load_key_from_csv(key_file_path)
+    files, unmatched = find_push_files(directory_path, key)
+    for file_name in unmatched:
+        print(f"Skipping {file_name}: no matching push in the key.")
+
+    options = {
+        'output_dir': output_dir, 'start_time': start_time, 'time_cutoff': time_cutoff,
+        'fit_wavelengths': list(fit_wavelengths), 'chunk_size': chunk_size,
+    }
+    errors, timing = [], []
+    status = {push: 'missing file' for push in key['push']}
+    baseline_push = {}
+    n_timepoints, cache_paths = {}, {}
+    fits = []
+
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            # Baselines first, since every other push on the same day depends on them
+            baseline_results = {}
+            if subtract_baselines:
+                baseline_files = {push: path for push, path in files.items()
+                                  if is_baseline(key[key['push'] == push].iloc[0])}
+                futures = {push: submit(executor, compute_baseline, path, chunk_size)
+                           for push, path in baseline_files.items()}
+                for push, future in futures.items():
+                    result, worker_error = worker_result(future)
+                    if worker_error is not None:
+                        baseline_results[push] = {'error': worker_error}
+                        errors.append({'push': push, 'file': baseline_files[push], 'stage': 'worker',
+                                       'error': worker_error})
+                        continue
+                    baseline_results[push] = result
+                    timing.append({'push': push, 'stage': 'baseline', 'seconds': result['seconds']})
+                    if 'error' in result:
+                        errors.append({'push': push, 'file': baseline_files[push], 'stage': 'baseline',
+                                       'error': result['error']})
+
+            futures = {}
+            for push, path in files.items():
+                if 'error' in baseline_results.get(push, {}):
+                    status[push] = 'error'
+                    continue
+                experiment = key[key['push'] == push].iloc[0]
+                baseline = None
+                push_status = 'ok'
+                if subtract_baselines and not is_baseline(experiment):
+                    candidates = [p for p in find_baseline_experiments(key, experiment)['push'] if p in baseline_results]
+                    if candidates:
+                        baseline_push[push] = candidates[0]
+                        baseline_result = baseline_results[candidates[0]]
+                        if 'error' in baseline_result:
+                            status[push] = 'error'
+                            errors.append({'push': push, 'file': path, 'stage': 'baseline',
+                                           'error': f"Baseline push {candidates[0]} failed."})
+                            continue
+                        baseline = baseline_result
+                    else:
+                        print(f"Warning: no baseline found for {push}; its data is not baseline corrected.")
+                        push_status = 'ok (no baseline)'
+                # Baselines are flat, so there is no kinetics to fit
+                push_options = {**options, 'fit_wavelengths': []} if is_baseline(experiment) else options
+                futures[push] = (submit(executor, process_push, push, path, baseline, push_options), push_status)
+
+            for push, (future, push_status) in futures.items():
+                result, worker_error = worker_result(future)
+                if worker_error is not None:
+                    status[push] = 'error'
+                    errors.append({'push': push, 'file': files[push], 'stage': 'worker',
+                                   'error': worker_error})
+                    continue
+                for stage, seconds in result['timing'].items():
+                    timing.append({'push': push, 'stage': stage, 'seconds': seconds})
+                fits.extend(result['fits'])
+                if 'error' in result:
+                    status[push] = 'error'
+                    errors.append({'push': push, 'file': files[push], 'stage': result['stage'],
+                                   'error': result['error']})
+                else:
+                    status[push] = push_status
+                    n_timepoints[push] = result['n_timepoints']
+                    cache_paths[push] = result['cache_path']
+                    print("Processed file:", push)
+    finally:
+        # Write the reports even if the run is interrupted, so failures are on record
+        summary = key.drop(columns=['data'], errors='ignore').copy()
+        summary['status'] = summary['push'].map(status)
+        summary['baseline_push'] = summary['push'].map(baseline_push)
+        summary['n_timepoints'] = summary['push'].map(n_timepoints).astype('Int64')
+        summary['cache_path'] = summary['push'].map(cache_paths)
+        summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+
+        fit_columns = ['push', 'requested_wavelength', 'wavelength', 'k_obs', 'k_obs_err',
+                       'amplitude', 'amplitude_err', 'offset', 'offset_err', 'fit_error']
+        pd.DataFrame(fits, columns=fit_columns).to_csv(os.path.join(output_dir, 'fits.csv'), index=False)
+
+        timing.append({'push': None, 'stage': 'total', 'seconds': time.perf_counter() - batch_start})
+        timing = pd.DataFrame(timing, columns=['push', 'stage', 'seconds'])
+        timing.to_csv(os.path.join(output_dir, 'timing.csv'), index=False)
+
+        errors = pd.DataFrame(errors, columns=['push', 'file', 'stage', 'error'])
+        errors.to_csv(os.path.join(output_dir, 'errors.csv'), index=False)
+
+    per_stage = timing[timing['stage'] != 'total'].groupby('stage')['seconds'].agg(['count', 'sum'])
+    n_ok = sum(1 for push in files if status[push].startswith('ok'))
+    print(f"Processed {n_ok} of {len(files)} files in {timing['seconds'].iloc[-1]:.2f} s")
+    for stage, row in per_stage.iterrows():
+        print(f"  {stage:10s} {int(row['count']):5d} files {row['sum']:10.2f} s")
+
+    return errors
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def parse_wavelengths(value):
+    return [float(w.strip()) for w in value.split(',') if w.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process a directory of stopped-flow pushes without the notebook.")
+    parser.add_argument('raw_data_dir', help="Directory containing the raw CSV files")
+    parser.add_argument('key_file', help="Key CSV describing each push")
+    parser.add_argument('-o', '--output-dir', default='batch_output')
+    parser.add_argument('-j', '--jobs', type=positive_int, default=None, help="Worker processes (default: number of CPUs)")
+    parser.add_argument('--start-time', type=float, default=None)
+    parser.add_argument('--time-cutoff', type=float, default=None)
+    parser.add_argument('--fit-wavelengths', type=parse_wavelengths, default=[],
+                        help="Comma-separated wavelengths (nm) to fit, e.g. 410,450")
+    parser.add_argument('--no-baseline', action='store_true', help="Skip baseline subtraction")
+    parser.add_argument('--chunk-size', type=positive_int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    errors = run_batch(
+        args.raw_data_dir, args.key_file, args.output_dir, jobs=args.jobs,
+        start_time=args.start_time, time_cutoff=args.time_cutoff,
+        fit_wavelengths=args.fit_wavelengths, subtract_baselines=not args.no_baseline,
+        chunk_size=args.chunk_size,
+    )
+    if not errors.empty:
+        print(f"{len(errors)} file(s) failed:", file=sys.stderr)
+        for _, error in errors.iterrows():
+            print(f"  {error['push']} ({error['stage']}): {error['error']}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
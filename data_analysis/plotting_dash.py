@@ -1,8 +1,12 @@
-from data_analysis.SF_analysis_processing import *
-import plotly.express as px
-import plotly.graph_objs as go
+from data_analysis.SF_analysis_processing import (
+    filter_by_time_cutoff, find_baseline_for_push, find_closest_wavelength,
+    get_experiments_by_criteria, subtract_baseline,
+)
 import pandas as pd
 
+# plotly is imported inside the plotting functions so that importing this
+# module stays cheap for code that never draws a figure
+
 # Function to fetch the time range for an experiment
 def get_time_range_for_experiment(key, substrate, pH=None, substrate_concentration=None, solvent=None, index=None):
     # Fetch experiments based on the criteria
@@ -21,6 +25,9 @@ def get_time_range_for_experiment(key, substrate, pH=None, substrate_concentrati
     return min_time, max_time
 
 def plot_wavelength_vs_intensity_dash(key, substrate, pH=None, substrate_concentration=None, solvent=None, index=None, time_step=10, time_range=None, subtract_baseline_flag=False, wavelength_plotting_range=None):
+    import plotly.colors
+    import plotly.graph_objs as go
+
     # Build the criteria dictionary with only non-None values
     criteria = {'substrate': substrate, 'pH': pH, 'substrate_concentration': substrate_concentration, 'solvent': solvent}
 
@@ -70,7 +77,7 @@ def plot_wavelength_vs_intensity_dash(key, substrate, pH=None, substrate_concent
             last_wavelength = float(wavelength_columns[-1])
 
         # Viridis color scale
-        color_scale = px.colors.sequential.Viridis
+        color_scale = plotly.colors.sequential.Viridis
 
         # Plotting data for each time point
         for time_point in selected_time_points:
@@ -130,6 +137,8 @@ def plot_specified_wavelength_traces(key, push_number, wavelengths, time_cutoff=
     - push_number: The specific push number to plot data for.
     - wavelengths: A list of desired wavelengths to plot.
     """
+    import plotly.graph_objs as go
+
     # Find the experiment with the given push number
     experiment = key.loc[(key['push'] == push_number) & key['data'].notnull()].iloc[0]
     if experiment is None:
@@ -174,4 +183,42 @@ def plot_specified_wavelength_traces(key, push_number, wavelengths, time_cutoff=
             size=12
         )
     )
-    return fig
\ No newline at end of file
+    return fig
+
+def plot_comparison(grid, resampled, labels, mode, value, xaxis_type='linear'):
+    """
+    Overlays resampled series from several pushes in a single WebGL figure.
+    Args:
+    - grid: The shared time or wavelength grid.
+    - resampled: One row per push, as returned by resample_onto_grid.
+    - labels: Legend label for each row.
+    - mode: 'trace' (intensity vs. time) or 'spectrum' (intensity vs. wavelength).
+    - value: The wavelength or time point the series were taken at.
+    """
+    import plotly.colors
+    import plotly.graph_objs as go
+
+    fig = go.Figure()
+    color_scale = plotly.colors.sequential.Viridis
+    for i, (row, label) in enumerate(zip(resampled, labels)):
+        color = color_scale[int(i / max(len(labels) - 1, 1) * (len(color_scale) - 1))]
+        fig.add_trace(go.Scattergl(
+            x=grid, y=row, mode='lines', name=label,
+            line=dict(color=color, width=1.5),
+            connectgaps=False
+        ))
+
+    if mode == 'trace':
+        title, xaxis_title = f"Wavelength Traces at {value} nm", "Time"
+    else:
+        title, xaxis_title = f"Spectra at t = {value}", "Wavelength (nm)"
+        xaxis_type = 'linear'
+
+    fig.update_layout(
+        title={'text': f"{title} ({len(labels)} experiments)"},
+        xaxis_title=xaxis_title,
+        xaxis_type=xaxis_type,
+        yaxis_title="Intensity",
+        uirevision=mode
+    )
+    return fig